@@ -1,27 +1,159 @@
-import json
-from typing import Annotated, TypedDict
+import asyncio
+import functools
+import threading
+import weakref
+from collections.abc import AsyncIterable, AsyncIterator, Sequence
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from math import fsum
+from typing import Annotated, Any
+from urllib.parse import quote
 
 import httpx
+import ijson
+import orjson
 from arcade.sdk import ToolContext, tool  # type: ignore[import-untyped]
 from arcade.sdk.errors import RetryableToolError
+from cachetools import Cache, LRUCache, TTLCache
 from loguru import logger
 
 RETRY_AFTER_MS = 500
 
+# What `get_params` yields when only the defaults are passed, for call sites that can skip it.
+_DEFAULT_PARAMS: dict[str, str | int | None] = {"fields": "*"}
+
+# Record ids travel in the query string, so large lookups are split to stay under URL length limits.
+IDS_PER_REQUEST = 100
+
+# Identical record queries repeated within a few seconds (retries, re-planning) are served from
+# memory, and identical queries issued concurrently share one in-flight request.
+RECORDS_CACHE_TTL_S = 5
+_RECORDS_CACHE: TTLCache[tuple[Any, ...], str] = TTLCache(maxsize=128, ttl=RECORDS_CACHE_TTL_S)
+
+# Schemas rarely change within a session, so they are kept until explicitly cleared.
+_SCHEMA_CACHE: LRUCache[tuple[str, str, str], str] = LRUCache(maxsize=256)
+
+# arcade runs every tool on its worker's event loop (async tools are awaited, sync ones called
+# inline), so calls on one loop never race. The caches are module-level, though, and shared with
+# any other loop in the process, possibly on another thread; cachetools caches are not thread-safe.
+_CACHE_LOCK = threading.Lock()
+# Keyed on the running loop too, since a task can only be awaited from the loop that runs it.
+_RECORDS_IN_FLIGHT: dict[tuple[Any, ...], asyncio.Task[str]] = {}
+
+_LIMITS = httpx.Limits(max_keepalive_connections=20, max_connections=100)
+
+# Transient failures are retried on the pooled connection before surfacing as RetryableToolError.
+# The backoff is an asyncio.sleep, so other tool calls on the worker loop keep running meanwhile.
+TRANSPORT_RETRIES = 3
+RETRY_BACKOFF_S = 0.25
+# A server asking for a longer pause than this gets the response back instead of a blocked call.
+MAX_RETRY_AFTER_S = 10.0
+RETRYABLE_STATUS_CODES = frozenset({429, 502, 503, 504})
+
+
+def _retry_delay(response: httpx.Response, attempt: int) -> float | None:
+    """Seconds to wait before retrying `response`, honouring Retry-After; None to give up."""
+    backoff = RETRY_BACKOFF_S * 2.0**attempt
+    retry_after = response.headers.get("Retry-After")
+    if retry_after is None:
+        return backoff
+    try:
+        delay = float(retry_after)
+    except ValueError:
+        try:
+            retry_at = parsedate_to_datetime(retry_after)
+            delay = (retry_at - datetime.now(timezone.utc)).total_seconds()
+        except (TypeError, ValueError):
+            return backoff
+    return max(delay, 0.0) if delay <= MAX_RETRY_AFTER_S else None
+
+
+class AsyncRetryTransport(httpx.AsyncHTTPTransport):
+    """Async HTTP transport that also retries transient error responses.
+
+    Connection failures are retried by httpx itself via ``retries``; this adds the same number of
+    retries for `RETRYABLE_STATUS_CODES`, waiting as long as Retry-After asks (up to
+    `MAX_RETRY_AFTER_S`) or backing off exponentially. Only GET requests are retried.
+    """
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        for attempt in range(TRANSPORT_RETRIES):
+            response = await super().handle_async_request(request)
+            if request.method != "GET" or response.status_code not in RETRYABLE_STATUS_CODES:
+                return response
+            if (delay := _retry_delay(response, attempt)) is None:
+                return response
+            await response.aclose()
+            await asyncio.sleep(delay)
+        return await super().handle_async_request(request)
+
+
+# Pooled clients are keyed on (base URL, API key); the bound keeps rotated keys from accumulating
+# open clients, and the least recently used one is closed when a new pair pushes it out.
+MAX_CLIENTS = 16
+
+# An AsyncClient's pooled connections belong to the event loop that opened them, so async clients
+# are kept per running loop rather than per process.
+_ASYNC_CLIENTS: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, LRUCache[tuple[str, str], httpx.AsyncClient]
+] = weakref.WeakKeyDictionary()
+# Strong references to each loop's `_close_async_clients` generator, which the loop tracks weakly.
+_ASYNC_CLIENT_CLOSERS: weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop, AsyncIterator[None]
+] = weakref.WeakKeyDictionary()
+
+
+async def _close_async_clients() -> AsyncIterator[None]:
+    # Suspended until the loop's runner calls `shutdown_asyncgens()` (asyncio.run does so before
+    # closing the loop), which is the last point at which the clients can still be awaited closed.
+    try:
+        yield
+    finally:
+        loop = asyncio.get_running_loop()
+        for client in _ASYNC_CLIENTS.pop(loop, {}).values():
+            await client.aclose()
+        _ASYNC_CLIENT_CLOSERS.pop(loop, None)
+
+
+async def _async_client_for(base_url: str, dream_factory_api_key: str) -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    clients = _ASYNC_CLIENTS.get(loop)
+    if clients is None:
+        clients = _ASYNC_CLIENTS[loop] = LRUCache(maxsize=MAX_CLIENTS)
+        closer = _close_async_clients()
+        await anext(closer)
+        _ASYNC_CLIENT_CLOSERS[loop] = closer
+    if (client := clients.get((base_url, dream_factory_api_key))) is None:
+        if len(clients) >= MAX_CLIENTS:
+            await clients.popitem()[1].aclose()
+        client = clients[base_url, dream_factory_api_key] = httpx.AsyncClient(
+            base_url=base_url,
+            # httpx's default Accept-Encoding already offers br once the brotli extra is installed.
+            headers={"X-DreamFactory-API-Key": dream_factory_api_key},
+            timeout=30.0,
+            transport=AsyncRetryTransport(http2=True, limits=_LIMITS, retries=TRANSPORT_RETRIES),
+        )
+    return client
+
+
+def _secrets(context: ToolContext) -> tuple[str, str]:
+    """Read the DreamFactory base URL and API key once, to pass down for the rest of the call."""
+    return context.get_secret("DREAM_FACTORY_BASE_URL"), context.get_secret("DREAM_FACTORY_API_KEY")
+
 
 def get_params(
     filter_str: str = "",
-    fields: str | list[str] = "*",
+    fields: list[str] | tuple[str, ...] = ("*",),
     limit: int | None = None,
     offset: int = 0,
     order_field: str = "",
-    related: str | list[str] = "",
+    related: list[str] | tuple[str, ...] = (),
 ) -> dict[str, str | int | None]:
     params: dict[str, str | int | None] = {}
     if filter_str:
         params["filter"] = filter_str
     if fields:
-        params["fields"] = fields if isinstance(fields, str) else ",".join(fields)
+        params["fields"] = ",".join(fields)
     if limit:
         params["limit"] = limit
     if offset:
@@ -29,36 +161,107 @@ def get_params(
     if order_field:
         params["order"] = order_field
     if related:
-        params["related"] = related if isinstance(related, str) else ",".join(related)
+        params["related"] = ",".join(related)
     return params
 
 
-class TableUrlWithHeaders(TypedDict):
-    url: str
-    headers: dict[str, str]
+def _records_cache_key(
+    base_url: str, dream_factory_api_key: str, table_name: str, params: dict[str, str | int | None]
+) -> tuple[Any, ...]:
+    return (base_url, dream_factory_api_key, table_name, *params.items())
+
+
+def _cache_get(cache: Cache[Any, str], key: tuple[Any, ...]) -> str | None:
+    with _CACHE_LOCK:
+        return cache.get(key)
+
 
+def _cache_set(cache: Cache[Any, str], key: tuple[Any, ...], value: str) -> None:
+    with _CACHE_LOCK:
+        cache[key] = value
 
-def table_url_with_headers(table_name: str, base_url: str, dream_factory_api_key: str) -> TableUrlWithHeaders:
-    return {"url": f"{base_url}/_table/{table_name}", "headers": {"X-DreamFactory-API-Key": dream_factory_api_key}}
+
+async def _iter_items(chunks: AsyncIterable[bytes], prefix: str) -> AsyncIterator[Any]:
+    """Parse a JSON byte stream incrementally, yielding each value under `prefix` once complete."""
+    items = ijson.sendable_list()
+    parser = ijson.items_coro(items, prefix, use_float=True)
+    async for chunk in chunks:
+        parser.send(chunk)
+        for item in items:
+            yield item
+        del items[:]
+    parser.close()
+    for item in items:
+        yield item
+
+
+@functools.lru_cache(maxsize=512)
+def table_path(table_name: str) -> str:
+    return f"/_table/{quote(table_name, safe='')}"
+
+
+@functools.lru_cache(maxsize=512)
+def schema_path(table_name: str) -> str:
+    return f"/_schema/{quote(table_name, safe='')}"
+
+
+def chunk_ids(ids: str | list[str] | list[int] | tuple[str | int, ...]) -> list[list[str]]:
+    # A bare string is a comma-separated id list, not a sequence of one-character ids.
+    if isinstance(ids, str):
+        ids = ids.split(",")
+    return [
+        list(map(str, ids[i : i + IDS_PER_REQUEST])) for i in range(0, len(ids), IDS_PER_REQUEST)
+    ]
+
+
+def ids_params(
+    ids: list[str], fields: list[str] | None = None, related: list[str] | None = None
+) -> dict[str, str | int | None]:
+    params: dict[str, str | int | None] = {"ids": ",".join(ids), **_DEFAULT_PARAMS}
+    if fields or related:
+        params.update(get_params(fields=fields or ("*",), related=related or ()))
+    return params
+
+
+def merge_resources(bodies: Sequence[str]) -> str:
+    if len(bodies) == 1:
+        return bodies[0]
+    records = [record for body in bodies for record in orjson.loads(body)["resource"]]
+    return orjson.dumps({"resource": records}).decode()
+
+
+async def _fetch_schema(base_url: str, dream_factory_api_key: str, table_name: str) -> str:
+    key = (base_url, dream_factory_api_key, table_name)
+    if (schema := _cache_get(_SCHEMA_CACHE, key)) is not None:
+        return schema
+    # Error responses raise instead of returning, so they are never cached.
+    client = await _async_client_for(base_url, dream_factory_api_key)
+    response = await client.get(schema_path(table_name))
+    response.raise_for_status()
+    _cache_set(_SCHEMA_CACHE, key, response.text)
+    return response.text
 
 
 @tool(requires_secrets=["DREAM_FACTORY_BASE_URL", "DREAM_FACTORY_API_KEY"])  # type: ignore[arg-type]
-def list_table_names(context: ToolContext) -> str:
+async def list_table_names(context: ToolContext) -> str:
     """List the names of all the available tables."""
 
-    base_url = context.get_secret("DREAM_FACTORY_BASE_URL")
-    dream_factory_api_key = context.get_secret("DREAM_FACTORY_API_KEY")
+    client = await _async_client_for(*_secrets(context))
     try:
-        res = httpx.get(url=f"{base_url}/_table", headers={"X-DreamFactory-API-Key": dream_factory_api_key}).json()
+        async with client.stream("GET", "/_table") as response:
+            response.raise_for_status()
+            names = [
+                name async for name in _iter_items(response.aiter_bytes(), "resource.item.name")
+            ]
     except Exception as e:
         raise RetryableToolError(  # noqa: TRY003
             f"Failed to list table names: {e}", retry_after_ms=RETRY_AFTER_MS
         ) from e
-    return json.dumps({"available_tables": [t["name"] for t in res["resource"]]})
+    return orjson.dumps({"available_tables": names}).decode()
 
 
 @tool(requires_secrets=["DREAM_FACTORY_BASE_URL", "DREAM_FACTORY_API_KEY"])  # type: ignore[arg-type]
-def get_table_schema(
+async def get_table_schema(
     context: ToolContext, table_name: Annotated[str, "The name of the table to get the schema for"]
 ) -> str:
     """Get the schema of a table.
@@ -74,23 +277,75 @@ def get_table_schema(
         The schema information for the specified table
     """
 
-    base_url = context.get_secret("DREAM_FACTORY_BASE_URL")
-    dream_factory_api_key = context.get_secret("DREAM_FACTORY_API_KEY")
-    logger.info(f"Accessing schema for table {table_name} with API key {dream_factory_api_key}")
+    base_url, dream_factory_api_key = _secrets(context)
+    logger.debug("Accessing schema for table {}", table_name)
     try:
-        return json.dumps(
-            httpx.get(
-                url=f"{base_url}/_schema/{table_name}", headers={"X-DreamFactory-API-Key": dream_factory_api_key}
-            ).json()
-        )
+        return await _fetch_schema(base_url, dream_factory_api_key, table_name)
     except Exception as e:
         raise RetryableToolError(  # noqa: TRY003
             f"Failed to get schema for table {table_name}: {e}", retry_after_ms=RETRY_AFTER_MS
         ) from e
 
 
+@tool
+def clear_schema_cache() -> str:
+    """Clear the cached table schemas so the next schema lookup is fetched fresh from DreamFactory.
+
+    Returns
+    -------
+    str
+        A confirmation message
+    """
+    with _CACHE_LOCK:
+        _SCHEMA_CACHE.clear()
+    return "Schema cache cleared"
+
+
+@tool(requires_secrets=["DREAM_FACTORY_BASE_URL", "DREAM_FACTORY_API_KEY"])  # type: ignore[arg-type]
+async def get_schemas_for_tables(
+    context: ToolContext,
+    table_names: Annotated[list[str], "The names of the tables to get the schemas for"],
+) -> str:
+    """Get the schemas of several tables in a single request.
+
+    Schemas already cached by an earlier lookup are reused; the rest are fetched together.
+
+    Parameters
+    ----------
+    table_names : list[str]
+        The names of the tables to get the schemas for
+
+    Returns
+    -------
+    dict[str, list]
+        The schema information for each of the specified tables
+    """
+
+    base_url, dream_factory_api_key = _secrets(context)
+    schemas = {
+        table_name: schema
+        for table_name in table_names
+        if (schema := _cache_get(_SCHEMA_CACHE, (base_url, dream_factory_api_key, table_name)))
+    }
+    try:
+        if missing := [table_name for table_name in table_names if table_name not in schemas]:
+            client = await _async_client_for(base_url, dream_factory_api_key)
+            response = await client.get("/_schema", params={"ids": ",".join(missing)})
+            response.raise_for_status()
+            for schema in orjson.loads(response.content)["resource"]:
+                schemas[schema["name"]] = text = orjson.dumps(schema).decode()
+                _cache_set(_SCHEMA_CACHE, (base_url, dream_factory_api_key, schema["name"]), text)
+        # Each schema is already a JSON document, so splice them rather than re-parsing.
+        return '{"schemas": [' + ", ".join(schemas[table_name] for table_name in table_names) + "]}"
+    except Exception as e:
+        raise RetryableToolError(  # noqa: TRY003
+            f"Failed to get schemas for tables {', '.join(table_names)}: {e}",
+            retry_after_ms=RETRY_AFTER_MS,
+        ) from e
+
+
 @tool(requires_secrets=["DREAM_FACTORY_BASE_URL", "DREAM_FACTORY_API_KEY"])  # type: ignore[arg-type]
-def get_table_records(
+async def get_table_records(
     context: ToolContext,
     table_name: Annotated[str, "The name of the table to get the records from"],
     filter_str: Annotated[
@@ -190,24 +445,33 @@ def get_table_records(
     >>> # Range filtering
     >>> (Age >= 30) AND (Age < 40)
     """
+    base_url, dream_factory_api_key = _secrets(context)
+    params = get_params(
+        filter_str=filter_str,
+        fields=fields or ("*",),
+        limit=limit,
+        offset=offset,
+        order_field=order_field,
+        related=related or (),
+    )
+    key = _records_cache_key(base_url, dream_factory_api_key, table_name, params)
+    if (records := _cache_get(_RECORDS_CACHE, key)) is not None:
+        return records
+
+    async def fetch() -> str:
+        client = await _async_client_for(base_url, dream_factory_api_key)
+        response = await client.get(table_path(table_name), params=params)
+        response.raise_for_status()
+        _cache_set(_RECORDS_CACHE, key, response.text)
+        return response.text
+
+    in_flight_key = (asyncio.get_running_loop(), *key)
+    if (task := _RECORDS_IN_FLIGHT.get(in_flight_key)) is None:
+        task = _RECORDS_IN_FLIGHT[in_flight_key] = asyncio.ensure_future(fetch())
+        task.add_done_callback(lambda _: _RECORDS_IN_FLIGHT.pop(in_flight_key, None))
     try:
-        return json.dumps(
-            httpx.get(
-                **table_url_with_headers(
-                    table_name=table_name,
-                    base_url=context.get_secret("DREAM_FACTORY_BASE_URL"),
-                    dream_factory_api_key=context.get_secret("DREAM_FACTORY_API_KEY"),
-                ),
-                params=get_params(
-                    filter_str=filter_str,
-                    fields=fields or "*",
-                    limit=limit,
-                    offset=offset,
-                    order_field=order_field,
-                    related=related or "",
-                ),
-            ).json()
-        )
+        # Shielded so one caller being cancelled does not cancel the request for the others.
+        return await asyncio.shield(task)
     except Exception as e:
         raise RetryableToolError(  # noqa: TRY003
             f"Failed to get records for table {table_name}: {e}", retry_after_ms=RETRY_AFTER_MS
@@ -215,7 +479,7 @@ def get_table_records(
 
 
 @tool(requires_secrets=["DREAM_FACTORY_BASE_URL", "DREAM_FACTORY_API_KEY"])  # type: ignore[arg-type]
-def get_table_records_by_ids(
+async def get_table_records_by_ids(
     context: ToolContext,
     table_name: Annotated[str, "The name of the table to get the records from"],
     ids: Annotated[list[str], "The IDs of the records to get"],
@@ -250,25 +514,54 @@ def get_table_records_by_ids(
     dict
         The records of the table
     """
-    params: dict[str, str | int | None] = {"ids": ids if isinstance(ids, str) else ",".join(ids)}
-    params.update(get_params(fields=fields or "*", related=related or ""))
+    client = await _async_client_for(*_secrets(context))
+    path = table_path(table_name)
+
+    async def fetch(chunk: list[str]) -> str:
+        response = await client.get(path, params=ids_params(chunk, fields=fields, related=related))
+        response.raise_for_status()
+        return response.text
+
     try:
-        return json.dumps(
-            httpx.get(
-                **table_url_with_headers(
-                    table_name=table_name,
-                    base_url=context.get_secret("DREAM_FACTORY_BASE_URL"),
-                    dream_factory_api_key=context.get_secret("DREAM_FACTORY_API_KEY"),
-                ),
-                params=params,
-            ).json()
-        )
+        # Chunks are fetched concurrently; gather keeps the results in the order of `ids`.
+        return merge_resources(await asyncio.gather(*[fetch(chunk) for chunk in chunk_ids(ids)]))
     except Exception as e:
         raise RetryableToolError(  # noqa: TRY003
             f"Failed to get records for table {table_name}: {e}", retry_after_ms=RETRY_AFTER_MS
         ) from e
 
 
+async def stream_table_records(
+    context: ToolContext,
+    table_name: str,
+    filter_str: str = "",
+    fields: list[str] | None = None,
+    limit: int | None = None,
+    offset: int = 0,
+    order_field: str = "",
+    related: list[str] | None = None,
+) -> AsyncIterator[dict[str, Any]]:
+    """Yield the records of a table one at a time as the response body arrives.
+
+    Takes the same arguments as `get_table_records`, but parses the body incrementally so
+    memory stays bounded by the chunk size instead of the full response size.
+    """
+
+    params = get_params(
+        filter_str=filter_str,
+        fields=fields or ("*",),
+        limit=limit,
+        offset=offset,
+        order_field=order_field,
+        related=related or (),
+    )
+    client = await _async_client_for(*_secrets(context))
+    async with client.stream("GET", table_path(table_name), params=params) as response:
+        response.raise_for_status()
+        async for record in _iter_items(response.aiter_bytes(), "resource.item"):
+            yield record
+
+
 @tool
 def calculate_sum(values: Annotated[list[float], "List of numerical values to sum"]) -> float:
     """Calculate the sum of a list of values.
@@ -283,7 +576,7 @@ def calculate_sum(values: Annotated[list[float], "List of numerical values to su
     float
         Sum of the input values
     """
-    return sum(values)
+    return fsum(values)
 
 
 @tool
@@ -317,6 +610,7 @@ def calculate_mean(values: Annotated[list[float], "List of numerical values to c
     Returns
     -------
     float
-        Arithmetic mean of the input values
+        Arithmetic mean of the input values, or 0.0 if no values are given
     """
-    return sum(values) / len(values)
+    n = len(values)
+    return fsum(values) / n if n else 0.0
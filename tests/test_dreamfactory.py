@@ -1,8 +1,76 @@
+import asyncio
+import gzip
+import json
+import threading
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterator
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import brotli
+import httpx
 import pytest
-from arcade.sdk.errors import ToolExecutionError
+from arcade.sdk import ToolContext
+from arcade.sdk.errors import RetryableToolError, ToolExecutionError
+from loguru import logger
 
+from arcade_dreamfactory.tools import df_tools
 from arcade_dreamfactory.tools.hello import say_hello
 
+Handler = Callable[[httpx.Request], httpx.Response | Awaitable[httpx.Response]]
+
+
+@pytest.fixture
+def context() -> ToolContext:
+    context = ToolContext()
+    context.set_secret("DREAM_FACTORY_BASE_URL", "https://df.example.com/api/v2/db")
+    context.set_secret("DREAM_FACTORY_API_KEY", "secret-key")
+    return context
+
+
+@pytest.fixture
+def mock_dreamfactory(monkeypatch: pytest.MonkeyPatch) -> Callable[[Handler], None]:
+    """Route the tools' pooled client through an in-process handler instead of the network."""
+
+    def install(handler: Handler) -> None:
+        df_tools._SCHEMA_CACHE.clear()
+        df_tools._RECORDS_CACHE.clear()
+        transport = httpx.MockTransport(handler)
+
+        async def async_client_for(base_url: str, api_key: str) -> httpx.AsyncClient:
+            return httpx.AsyncClient(
+                base_url=base_url, headers={"X-DreamFactory-API-Key": api_key}, transport=transport
+            )
+
+        monkeypatch.setattr(df_tools, "_async_client_for", async_client_for)
+
+    return install
+
+
+class _SchemaHandler(BaseHTTPRequestHandler):
+    def do_GET(self) -> None:
+        body = json.dumps({"name": self.path.rsplit("/", 1)[-1]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: object) -> None:  # noqa: A002
+        pass
+
+
+@pytest.fixture
+def local_context() -> Iterator[ToolContext]:
+    """A context pointing at a real HTTP server on localhost, for exercising the pooled client."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _SchemaHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    context = ToolContext()
+    context.set_secret("DREAM_FACTORY_BASE_URL", f"http://127.0.0.1:{server.server_port}/api/v2/db")
+    context.set_secret("DREAM_FACTORY_API_KEY", "secret-key")
+    yield context
+    server.shutdown()
+    server.server_close()
+
 
 def test_hello() -> None:
     assert say_hello("developer") == "Hello, developer!"
@@ -11,3 +79,476 @@ def test_hello() -> None:
 def test_hello_raises_error() -> None:
     with pytest.raises(ToolExecutionError):
         say_hello(1)
+
+
+def test_get_schemas_for_tables_uses_one_request(
+    context: ToolContext, mock_dreamfactory: Callable[[Handler], None]
+) -> None:
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(
+            200, json={"resource": [{"name": "employees"}, {"name": "departments"}]}
+        )
+
+    mock_dreamfactory(handler)
+    result = asyncio.run(df_tools.get_schemas_for_tables(context, ["employees", "departments"]))
+    assert json.loads(result) == {"schemas": [{"name": "employees"}, {"name": "departments"}]}
+    assert len(requests) == 1
+    assert requests[0].url.path == "/api/v2/db/_schema"
+    assert requests[0].url.params["ids"] == "employees,departments"
+
+
+def test_get_table_schema_is_cached(
+    context: ToolContext, mock_dreamfactory: Callable[[Handler], None]
+) -> None:
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json={"name": "employees"})
+
+    mock_dreamfactory(handler)
+    assert json.loads(asyncio.run(df_tools.get_table_schema(context, "employees"))) == {
+        "name": "employees"
+    }
+    assert json.loads(asyncio.run(df_tools.get_table_schema(context, "employees"))) == {
+        "name": "employees"
+    }
+    assert len(requests) == 1
+
+    df_tools.clear_schema_cache()
+    asyncio.run(df_tools.get_table_schema(context, "employees"))
+    assert len(requests) == 2
+
+
+def test_get_table_records_returns_response_body(
+    context: ToolContext, mock_dreamfactory: Callable[[Handler], None]
+) -> None:
+    body = '{"resource":[{"id":1,"first_name":"John"}]}'
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.url.path == "/api/v2/db/_table/employees"
+        assert dict(request.url.params) == {"fields": "id,first_name", "limit": "1"}
+        return httpx.Response(200, text=body)
+
+    mock_dreamfactory(handler)
+    assert (
+        asyncio.run(
+            df_tools.get_table_records(context, "employees", fields=["id", "first_name"], limit=1)
+        )
+        == body
+    )
+
+
+def test_get_table_records_raises_on_error_status(
+    context: ToolContext, mock_dreamfactory: Callable[[Handler], None]
+) -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(404, json={"error": {"message": "Table not found"}})
+
+    mock_dreamfactory(handler)
+    with pytest.raises(RetryableToolError):
+        asyncio.run(df_tools.get_table_records(context, "missing"))
+
+
+def test_list_table_names(
+    context: ToolContext, mock_dreamfactory: Callable[[Handler], None]
+) -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert request.url.path == "/api/v2/db/_table"
+        return httpx.Response(
+            200,
+            json={
+                "resource": [{"name": "employees", "label": "Employees"}, {"name": "departments"}]
+            },
+        )
+
+    mock_dreamfactory(handler)
+    assert json.loads(asyncio.run(df_tools.list_table_names(context))) == {
+        "available_tables": ["employees", "departments"]
+    }
+
+
+def test_stream_table_records(
+    context: ToolContext, mock_dreamfactory: Callable[[Handler], None]
+) -> None:
+    body = b'{"resource": [{"id": 1, "salary": 1.5}, {"id": 2, "salary": 2.5}]}'
+
+    async def chunks() -> AsyncIterator[bytes]:
+        # Split the body so records straddle chunk boundaries.
+        yield body[:30]
+        yield body[30:]
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, content=chunks())
+
+    mock_dreamfactory(handler)
+
+    async def collect() -> list[dict[str, object]]:
+        return [record async for record in df_tools.stream_table_records(context, "employees")]
+
+    assert asyncio.run(collect()) == [
+        {"id": 1, "salary": 1.5},
+        {"id": 2, "salary": 2.5},
+    ]
+
+
+@pytest.mark.parametrize(
+    ("fields", "related", "expected"),
+    [
+        (None, None, {"ids": "1,2", "fields": "*"}),
+        (["id"], None, {"ids": "1,2", "fields": "id"}),
+        (None, ["departments"], {"ids": "1,2", "fields": "*", "related": "departments"}),
+    ],
+)
+def test_get_table_records_by_ids_params(
+    context: ToolContext,
+    mock_dreamfactory: Callable[[Handler], None],
+    fields: list[str] | None,
+    related: list[str] | None,
+    expected: dict[str, str],
+) -> None:
+    def handler(request: httpx.Request) -> httpx.Response:
+        assert dict(request.url.params) == expected
+        return httpx.Response(200, json={"resource": []})
+
+    mock_dreamfactory(handler)
+    asyncio.run(
+        df_tools.get_table_records_by_ids(
+            context, "employees", ["1", "2"], fields=fields, related=related
+        )
+    )
+
+
+def test_client_is_reused_per_instance() -> None:
+    base_url = "https://df.example.com/api/v2/db"
+
+    async def check() -> None:
+        client = await df_tools._async_client_for(base_url, "secret-key")
+        assert client.headers["X-DreamFactory-API-Key"] == "secret-key"
+        assert "br" in client.headers["Accept-Encoding"].split(", ")
+        assert client.build_request("GET", "/_table").url == f"{base_url}/_table"
+        assert await df_tools._async_client_for(base_url, "secret-key") is client
+        assert await df_tools._async_client_for(base_url, "other-key") is not client
+
+    asyncio.run(check())
+
+
+def test_evicted_clients_are_closed(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(df_tools, "MAX_CLIENTS", 2)
+    base_url = "https://df.example.com/api/v2/db"
+
+    async def open_clients() -> list[httpx.AsyncClient]:
+        clients = [await df_tools._async_client_for(base_url, f"key-{i}") for i in range(3)]
+        assert [client.is_closed for client in clients] == [True, False, False]
+        return clients
+
+    assert all(client.is_closed for client in asyncio.run(open_clients()))
+
+
+def test_calculate_sum_is_exact() -> None:
+    assert df_tools.calculate_sum([0.1] * 10) == 1.0
+    assert df_tools.calculate_sum([1e100, 1.0, -1e100]) == 1.0
+
+
+def test_calculate_mean() -> None:
+    assert df_tools.calculate_mean([1.0, 2.0, 3.0, 4.0]) == 2.5
+
+
+def test_calculate_mean_of_empty_list() -> None:
+    assert df_tools.calculate_mean([]) == 0.0
+
+
+def test_get_table_records_by_ids_chunks_large_lookups(
+    context: ToolContext, mock_dreamfactory: Callable[[Handler], None]
+) -> None:
+    requests: list[httpx.Request] = []
+    in_flight = peak = 0
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal in_flight, peak
+        requests.append(request)
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        ids = request.url.params["ids"].split(",")
+        return httpx.Response(200, json={"resource": [{"id": int(i)} for i in ids]})
+
+    mock_dreamfactory(handler)
+    ids = [str(i) for i in range(250)]
+    expected = {"resource": [{"id": i} for i in range(250)]}
+    assert (
+        json.loads(asyncio.run(df_tools.get_table_records_by_ids(context, "employees", ids)))
+        == expected
+    )
+    assert sorted(len(r.url.params["ids"].split(",")) for r in requests) == [50, 100, 100]
+    assert peak == 3
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "br"])
+def test_compressed_responses_are_decoded(
+    context: ToolContext, mock_dreamfactory: Callable[[Handler], None], encoding: str
+) -> None:
+    body = b'{"resource":[{"id":1}]}'
+    compressed = gzip.compress(body) if encoding == "gzip" else brotli.compress(body)
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, headers={"Content-Encoding": encoding}, content=compressed)
+
+    mock_dreamfactory(handler)
+    assert asyncio.run(df_tools.get_table_records(context, "employees")) == body.decode()
+
+
+def _serve_statuses(monkeypatch: pytest.MonkeyPatch, *responses: httpx.Response) -> None:
+    queued = iter(responses)
+
+    async def handle_async_request(
+        self: httpx.AsyncHTTPTransport, request: httpx.Request
+    ) -> httpx.Response:
+        return next(queued)
+
+    monkeypatch.setattr(httpx.AsyncHTTPTransport, "handle_async_request", handle_async_request)
+
+
+async def _get_table_status(delays: list[float], monkeypatch: pytest.MonkeyPatch) -> int:
+    async def sleep(delay: float) -> None:
+        delays.append(delay)
+
+    monkeypatch.setattr(df_tools.asyncio, "sleep", sleep)
+    async with httpx.AsyncClient(transport=df_tools.AsyncRetryTransport()) as client:
+        return (await client.get("https://df.example.com/api/v2/db/_table")).status_code
+
+
+def test_retry_transport_backs_off_on_transient_errors(monkeypatch: pytest.MonkeyPatch) -> None:
+    _serve_statuses(monkeypatch, httpx.Response(503), httpx.Response(502), httpx.Response(200))
+    delays: list[float] = []
+
+    assert asyncio.run(_get_table_status(delays, monkeypatch)) == 200
+    assert delays == [df_tools.RETRY_BACKOFF_S, df_tools.RETRY_BACKOFF_S * 2]
+
+
+def test_retry_transport_does_not_retry_client_errors(monkeypatch: pytest.MonkeyPatch) -> None:
+    _serve_statuses(monkeypatch, httpx.Response(404), httpx.Response(200))
+    delays: list[float] = []
+
+    assert asyncio.run(_get_table_status(delays, monkeypatch)) == 404
+    assert delays == []
+
+
+def test_retry_transport_honours_retry_after(monkeypatch: pytest.MonkeyPatch) -> None:
+    _serve_statuses(
+        monkeypatch,
+        httpx.Response(429, headers={"Retry-After": "2"}),
+        httpx.Response(429, headers={"Retry-After": "Wed, 21 Oct 2015 07:28:00 GMT"}),
+        httpx.Response(200),
+    )
+    delays: list[float] = []
+
+    assert asyncio.run(_get_table_status(delays, monkeypatch)) == 200
+    assert delays == [2.0, 0.0]
+
+
+def test_retry_transport_gives_up_on_long_retry_after(monkeypatch: pytest.MonkeyPatch) -> None:
+    _serve_statuses(
+        monkeypatch, httpx.Response(429, headers={"Retry-After": "120"}), httpx.Response(200)
+    )
+    delays: list[float] = []
+
+    assert asyncio.run(_get_table_status(delays, monkeypatch)) == 429
+    assert delays == []
+
+
+def test_tools_retry_transient_errors(
+    context: ToolContext, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    _serve_statuses(
+        monkeypatch, httpx.Response(503), httpx.Response(200, json={"name": "employees"})
+    )
+    delays: list[float] = []
+
+    async def sleep(delay: float) -> None:
+        delays.append(delay)
+
+    monkeypatch.setattr(df_tools.asyncio, "sleep", sleep)
+    df_tools.clear_schema_cache()
+    result = asyncio.run(df_tools.get_table_schema(context, "employees"))
+    assert json.loads(result) == {"name": "employees"}
+    assert delays == [df_tools.RETRY_BACKOFF_S]
+
+
+def test_get_params() -> None:
+    assert df_tools.get_params() == {"fields": "*"}
+    assert df_tools.get_params(
+        filter_str="(age > 30)",
+        fields=["id", "name"],
+        limit=10,
+        offset=20,
+        order_field="name DESC",
+        related=["departments", "managers"],
+    ) == {
+        "filter": "(age > 30)",
+        "fields": "id,name",
+        "limit": 10,
+        "offset": 20,
+        "order": "name DESC",
+        "related": "departments,managers",
+    }
+    assert df_tools.get_params(fields=("id", "name")) == {"fields": "id,name"}
+
+
+def test_chunk_ids_splits_comma_separated_string() -> None:
+    assert df_tools.chunk_ids("1,2,3") == df_tools.chunk_ids([1, 2, 3]) == [["1", "2", "3"]]
+
+
+def test_concurrent_get_table_records_calls_share_one_request(
+    context: ToolContext, mock_dreamfactory: Callable[[Handler], None]
+) -> None:
+    requests: list[httpx.Request] = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        await asyncio.sleep(0.01)
+        return httpx.Response(200, json={"resource": [{"id": 1}]})
+
+    mock_dreamfactory(handler)
+
+    async def fetch_concurrently() -> list[str]:
+        return await asyncio.gather(*[
+            df_tools.get_table_records(context, "employees") for _ in range(3)
+        ])
+
+    assert len(set(asyncio.run(fetch_concurrently()))) == 1
+    assert len(requests) == 1
+    assert not df_tools._RECORDS_IN_FLIGHT
+
+
+def test_repeated_get_table_records_calls_are_cached(
+    context: ToolContext, mock_dreamfactory: Callable[[Handler], None]
+) -> None:
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json={"resource": [{"request": len(requests)}]})
+
+    mock_dreamfactory(handler)
+    first = asyncio.run(df_tools.get_table_records(context, "employees"))
+    # None and ['*'] normalise to the same query.
+    assert asyncio.run(df_tools.get_table_records(context, "employees", fields=["*"])) == first
+    assert len(requests) == 1
+
+    assert asyncio.run(df_tools.get_table_records(context, "employees", limit=5)) != first
+    assert len(requests) == 2
+
+
+def test_list_table_names_raises_on_error_status(
+    context: ToolContext, mock_dreamfactory: Callable[[Handler], None]
+) -> None:
+    mock_dreamfactory(
+        lambda request: httpx.Response(401, json={"error": {"message": "Invalid API key"}})
+    )
+    with pytest.raises(RetryableToolError):
+        asyncio.run(df_tools.list_table_names(context))
+
+
+def test_get_table_schema_does_not_log_api_key(
+    context: ToolContext, mock_dreamfactory: Callable[[Handler], None]
+) -> None:
+    mock_dreamfactory(lambda request: httpx.Response(200, json={"name": "employees"}))
+    messages: list[str] = []
+    sink_id = logger.add(messages.append, level="DEBUG")
+    try:
+        asyncio.run(df_tools.get_table_schema(context, "employees"))
+    finally:
+        logger.remove(sink_id)
+    assert any("employees" in message for message in messages)
+    assert not any("secret-key" in message for message in messages)
+
+
+def test_table_names_are_quoted_in_paths(
+    context: ToolContext, mock_dreamfactory: Callable[[Handler], None]
+) -> None:
+    raw_paths: list[bytes] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        raw_paths.append(request.url.raw_path)
+        return httpx.Response(200, json={"resource": []})
+
+    mock_dreamfactory(handler)
+    asyncio.run(df_tools.get_table_records(context, "sales data/2024"))
+    asyncio.run(df_tools.get_table_schema(context, "sales data/2024"))
+    assert raw_paths == [
+        b"/api/v2/db/_table/sales%20data%2F2024?fields=%2A",
+        b"/api/v2/db/_schema/sales%20data%2F2024",
+    ]
+
+
+def test_async_clients_are_scoped_to_their_event_loop(local_context: ToolContext) -> None:
+    clients: list[httpx.AsyncClient] = []
+
+    async def fetch_schemas() -> list[str]:
+        clients.append(await df_tools._async_client_for(*df_tools._secrets(local_context)))
+        df_tools.clear_schema_cache()
+        return await asyncio.gather(*[
+            df_tools.get_table_schema(local_context, table)
+            for table in ("employees", "departments")
+        ])
+
+    for _ in range(3):
+        schemas = asyncio.run(fetch_schemas())
+        assert [json.loads(schema) for schema in schemas] == [
+            {"name": "employees"},
+            {"name": "departments"},
+        ]
+
+    assert len({id(client) for client in clients}) == 3
+    assert all(client.is_closed for client in clients)
+
+
+def test_get_schemas_for_tables_raises_on_error_status(
+    context: ToolContext, mock_dreamfactory: Callable[[Handler], None]
+) -> None:
+    mock_dreamfactory(
+        lambda request: httpx.Response(401, json={"error": {"message": "Invalid API key"}})
+    )
+    with pytest.raises(RetryableToolError, match="401 Unauthorized"):
+        asyncio.run(df_tools.get_schemas_for_tables(context, ["employees"]))
+
+
+def test_get_schemas_for_tables_with_no_tables_makes_no_request(
+    context: ToolContext, mock_dreamfactory: Callable[[Handler], None]
+) -> None:
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json={"resource": []})
+
+    mock_dreamfactory(handler)
+    assert json.loads(asyncio.run(df_tools.get_schemas_for_tables(context, []))) == {"schemas": []}
+    assert requests == []
+
+
+def test_get_schemas_for_tables_shares_the_schema_cache(
+    context: ToolContext, mock_dreamfactory: Callable[[Handler], None]
+) -> None:
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        if request.url.path.endswith("/_schema"):
+            names = request.url.params["ids"].split(",")
+            return httpx.Response(200, json={"resource": [{"name": name} for name in names]})
+        return httpx.Response(200, json={"name": request.url.path.rsplit("/", 1)[-1]})
+
+    mock_dreamfactory(handler)
+    asyncio.run(df_tools.get_table_schema(context, "employees"))
+    result = asyncio.run(df_tools.get_schemas_for_tables(context, ["employees", "departments"]))
+    assert json.loads(result) == {"schemas": [{"name": "employees"}, {"name": "departments"}]}
+    assert requests[-1].url.params["ids"] == "departments"
+
+    asyncio.run(df_tools.get_table_schema(context, "departments"))
+    assert len(requests) == 2